@@ -1,7 +1,88 @@
-from crewai import Agent, Crew, Task
+import asyncio
+from functools import cache
+from crewai import Agent, Crew, LLM, Task
 from ..tools.github_tools import create_github_tools
 
-def run_pr_analysis_crew(repo: str, pr_number: int, github_token: str):
+# Shared LLM clients (one per model), reused across agents and runs. Built on
+# first use rather than at import: LLM() needs OPENAI_API_KEY, which may only be
+# available once the server has loaded .env.
+# No parallel_tool_calls: an LLM() kwarg is sent on every call, including ones
+# without tools, which OpenAI rejects; when tools are sent it already defaults
+# to parallel calls.
+@cache
+def _llm(model: str) -> LLM:
+    return LLM(model=model)
+
+# Task prompts, built once at import; {repo}/{pr_number} (and the summary's
+# {overview}/{code_review}/{community}) are filled in by CrewAI at kickoff
+_OVERVIEW_TMPL = """Fetch PR #{pr_number} from repository {repo} and provide a comprehensive overview.
+
+Use the fetch_pr tool to get:
+- Title and description
+- Author and state
+- Statistics (files, additions, deletions, commits)
+- Overall purpose and scope
+"""
+
+_REVIEW_TMPL = """Perform a detailed code review of PR #{pr_number} from repository {repo}.
+
+Repository: {repo}
+PR Number: {pr_number}
+
+Use fetch_pr_files to examine:
+- What files changed
+- Code diffs and modifications
+- Patterns in the changes
+
+Identify:
+1. Key technical changes and their purpose
+2. Code quality observations
+3. Potential bugs or issues
+4. Security considerations
+5. Best practice violations
+
+Provide specific, actionable feedback."""
+
+_COMMUNITY_TMPL = """Analyze the discussion and feedback on PR #{pr_number} from repository {repo}.
+
+Repository: {repo}
+PR Number: {pr_number}
+
+Use fetch_pr_comments to examine:
+- Review comments
+- Discussion threads
+- Feedback from team members
+
+Identify:
+1. Main concerns raised by reviewers
+2. Points of consensus
+3. Unresolved questions or debates
+4. Overall community sentiment
+
+Summarize the discussion dynamics."""
+
+_SUMMARY_TMPL = """Synthesize all analyses into a comprehensive executive summary.
+
+PR overview (scope and purpose):
+{overview}
+
+Code review (technical quality):
+{code_review}
+
+Community discussion (team feedback):
+{community}
+
+Create a summary that includes:
+1. What changed and why (2-3 sentences)
+2. Code quality assessment
+3. Key concerns or risks identified
+4. Community sentiment
+5. Clear recommendation: Approve / Request Changes / Needs Discussion
+6. Reasoning for recommendation
+
+Make it suitable for non-technical stakeholders."""
+
+async def run_pr_analysis_crew(repo: str, pr_number: int, github_token: str):
     """
     Multi-agent crew where MULTIPLE agents can independently call GitHub API.
 
@@ -15,6 +96,10 @@ def run_pr_analysis_crew(repo: str, pr_number: int, github_token: str):
     4. Summarizer: Synthesizes everything into executive summary
 
     All agents 1-3 can make independent GitHub API calls!
+
+    Agents 1-3 don't depend on each other, so each runs in its own crew and
+    the three crews are kicked off concurrently. The summarizer runs last and
+    receives their outputs as inputs.
     """
 
     # Create tools once, share across all agents
@@ -27,7 +112,7 @@ def run_pr_analysis_crew(repo: str, pr_number: int, github_token: str):
         backstory="Expert at quickly understanding PR scope, purpose, and overall structure",
         tools=github_tools,  # Has access to ALL GitHub tools
         verbose=True,
-        llm="gpt-4o-mini"
+        llm=_llm("gpt-4o-mini")
     )
 
     # Agent 2: Senior Code Reviewer
@@ -37,7 +122,7 @@ def run_pr_analysis_crew(repo: str, pr_number: int, github_token: str):
         backstory="Senior engineer with 10+ years experience in code review. Knows common pitfalls and anti-patterns.",
         tools=github_tools,  # Has access to ALL GitHub tools
         verbose=True,
-        llm="gpt-4o"  # More powerful for deep analysis
+        llm=_llm("gpt-4o")  # More powerful for deep analysis
     )
 
     # Agent 3: Community Engagement Analyst
@@ -47,7 +132,7 @@ def run_pr_analysis_crew(repo: str, pr_number: int, github_token: str):
         backstory="Expert at understanding team dynamics, identifying consensus, and surfacing concerns from code reviews",
         tools=github_tools,  # Has access to ALL GitHub tools
         verbose=True,
-        llm="gpt-4o-mini"
+        llm=_llm("gpt-4o-mini")
     )
 
     # Agent 4: Executive Summarizer
@@ -57,43 +142,19 @@ def run_pr_analysis_crew(repo: str, pr_number: int, github_token: str):
         backstory="Skilled technical writer who distills complex technical information into actionable insights for stakeholders",
         tools=[],  # Doesn't need GitHub tools, works from other agents' outputs
         verbose=True,
-        llm="gpt-4o-mini"
+        llm=_llm("gpt-4o-mini")
     )
 
     # Task 1: Get PR Overview
     overview_task = Task(
-        description=f"""Fetch PR #{pr_number} from repository {repo} and provide a comprehensive overview.
-
-Use the fetch_pr tool to get:
-- Title and description
-- Author and state
-- Statistics (files, additions, deletions, commits)
-- Overall purpose and scope
-""",
+        description=_OVERVIEW_TMPL,
         expected_output="Complete PR overview with title, description, author, state, and statistics",
         agent=overview_agent
     )
 
     # Task 2: Analyze Code Changes
     code_review_task = Task(
-        description=f"""Perform a detailed code review of PR #{pr_number} from repository {repo}.
-
-Repository: {repo}
-PR Number: {pr_number}
-
-Use fetch_pr_files to examine:
-- What files changed
-- Code diffs and modifications
-- Patterns in the changes
-
-Identify:
-1. Key technical changes and their purpose
-2. Code quality observations
-3. Potential bugs or issues
-4. Security considerations
-5. Best practice violations
-
-Provide specific, actionable feedback.""",
+        description=_REVIEW_TMPL,
         expected_output="Technical code review with specific concerns, observations, and recommendations",
         agent=code_reviewer,
         context=[]  # No context needed! Agent calls GitHub API directly
@@ -101,23 +162,7 @@ Provide specific, actionable feedback.""",
 
     # Task 3: Analyze Community Discussion
     community_task = Task(
-        description=f"""Analyze the discussion and feedback on PR #{pr_number} from repository {repo}.
-
-Repository: {repo}
-PR Number: {pr_number}
-
-Use fetch_pr_comments to examine:
-- Review comments
-- Discussion threads
-- Feedback from team members
-
-Identify:
-1. Main concerns raised by reviewers
-2. Points of consensus
-3. Unresolved questions or debates
-4. Overall community sentiment
-
-Summarize the discussion dynamics.""",
+        description=_COMMUNITY_TMPL,
         expected_output="Summary of community feedback, concerns raised, and discussion sentiment",
         agent=community_analyst,
         context=[]  # No context needed! Agent calls GitHub API directly
@@ -125,33 +170,30 @@ Summarize the discussion dynamics.""",
 
     # Task 4: Create Executive Summary
     summary_task = Task(
-        description="""Synthesize all analyses into a comprehensive executive summary.
-
-Combine insights from:
-- PR overview (scope and purpose)
-- Code review (technical quality)
-- Community discussion (team feedback)
-
-Create a summary that includes:
-1. What changed and why (2-3 sentences)
-2. Code quality assessment
-3. Key concerns or risks identified
-4. Community sentiment
-5. Clear recommendation: Approve / Request Changes / Needs Discussion
-6. Reasoning for recommendation
-
-Make it suitable for non-technical stakeholders.""",
+        description=_SUMMARY_TMPL,
         expected_output="Executive summary (3-5 paragraphs) with clear recommendation and reasoning",
-        agent=summarizer,
-        context=[overview_task, code_review_task, community_task]  # Gets all outputs
+        agent=summarizer
     )
 
-    # Create crew
-    crew = Crew(
-        agents=[overview_agent, code_reviewer, community_analyst, summarizer],
-        tasks=[overview_task, code_review_task, community_task, summary_task],
-        verbose=True
+    # Create one crew per independent task so agents 1-3 can run in parallel
+    overview_crew = Crew(agents=[overview_agent], tasks=[overview_task], verbose=True)
+    code_review_crew = Crew(agents=[code_reviewer], tasks=[code_review_task], verbose=True)
+    community_crew = Crew(agents=[community_analyst], tasks=[community_task], verbose=True)
+    summary_crew = Crew(agents=[summarizer], tasks=[summary_task], verbose=True)
+
+    # Run agents 1-3 concurrently (wall-clock bounded by the slowest one)
+    inputs = {"repo": repo, "pr_number": pr_number}
+    overview, code_review, community = await asyncio.gather(
+        overview_crew.kickoff_async(inputs=inputs),
+        code_review_crew.kickoff_async(inputs=inputs),
+        community_crew.kickoff_async(inputs=inputs),
     )
 
-    result = crew.kickoff()
+    # Feed all outputs to the summarizer
+    result = await summary_crew.kickoff_async(inputs={
+        **inputs,
+        "overview": str(overview),
+        "code_review": str(code_review),
+        "community": str(community),
+    })
     return str(result)
@@ -1,23 +1,40 @@
-from crewai import Agent, Crew, Task
+from functools import cache
+from crewai import Agent, Crew, LLM, Task
 from ..tools.github_tools import FetchPRTool
 
-def run_pr_summary_crew(repo: str, pr_number: int, github_token: str | None = None):
-    # Create tool
-    fetch_tool = FetchPRTool(github_token=github_token)
+# Shared LLM client, reused across runs; created lazily so OPENAI_API_KEY can come from .env
+@cache
+def _llm() -> LLM:
+    return LLM(model="gpt-4o-mini")  # no parallel_tool_calls, see pr_analyzer
+
+# Task prompts, built once at import; placeholders are filled in by CrewAI at kickoff
+_FETCH_TMPL = "Fetch PR #{pr_number} from {repo} and summarize it"
+_PREFETCHED_TMPL = """Summarize PR #{pr_number} from {repo}.
+
+Here is the PR data, already fetched:
+
+{pr_details}
+
+Only use fetch_pr if you need to refresh it."""
+
+async def run_pr_summary_crew(repo: str, pr_number: int, *, github_token: str | None = None, tools: list | None = None, pr_details: str | None = None):
+    # Create tool (unless the caller brings its own, e.g. memoized tools)
+    if tools is None:
+        tools = [FetchPRTool(github_token=github_token)]
 
     # Create agent
     fetcher = Agent(
         role="PR Researcher",
         goal="Fetch and summarize PR information",
         backstory="You are an expert at analyzing pull requests",
-        tools=[fetch_tool],
+        tools=tools,
         verbose=True,
-        llm="gpt-4o-mini"  # Cheaper for testing
+        llm=_llm()  # gpt-4o-mini: cheaper for testing
     )
 
-    # Create task
+    # Create task (skip the fetch round-trip if the caller already has the PR)
     task = Task(
-        description=f"Fetch PR #{pr_number} from {repo} and summarize it",
+        description=_PREFETCHED_TMPL if pr_details else _FETCH_TMPL,
         expected_output="A brief summary of the PR",
         agent=fetcher
     )
@@ -29,6 +46,6 @@ def run_pr_summary_crew(repo: str, pr_number: int, github_token: str | None = No
         verbose=True
     )
 
-    # Run
-    result = crew.kickoff()
+    # Run without blocking the server's event loop
+    result = await crew.kickoff_async(inputs={"repo": repo, "pr_number": pr_number, "pr_details": pr_details or ""})
     return str(result)
\ No newline at end of file
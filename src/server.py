@@ -1,12 +1,27 @@
+import asyncio
+import hashlib
+import logging
+import traceback
+from contextlib import asynccontextmanager
 from fastmcp import FastMCP, Context
 import httpx
+import orjson
 import os
+from cachetools import TTLCache
 from dotenv import load_dotenv
 from keycardai.mcp.integrations.fastmcp import AuthProvider, ClientSecret
 
-# Load environment variables from .env file
+# Load environment variables from .env file (before the local imports below,
+# which read settings such as GITHUB_CONCURRENCY at import time)
 load_dotenv()
 
+from .crews.pr_analyzer import run_pr_analysis_crew
+from .crews.pr_summarizer import run_pr_summary_crew
+from .tools._cache import cached_get
+from .tools.github_tools import FetchPRTool, PRArgSchema, error_snippet, format_pr_details, prefetch_pr_bundle
+
+log = logging.getLogger(__name__)
+
 # Create Keycard authentication provider
 auth_provider = AuthProvider(
     zone_id=os.getenv("KEYCARD_ZONE_ID"),
@@ -21,8 +36,32 @@ auth_provider = AuthProvider(
 # Get RemoteAuthProvider for FastMCP
 auth = auth_provider.get_remote_auth_provider()
 
+# Shared HTTP client for GitHub calls (keeps connections alive across requests)
+_HTTP = httpx.AsyncClient(
+    base_url="https://api.github.com",
+    http2=True,
+    headers={
+        "Accept": "application/vnd.github+json",
+        "X-GitHub-Api-Version": "2022-11-28",
+        "Accept-Encoding": "gzip, br, deflate"  # GitHub JSON compresses well
+    },
+    timeout=httpx.Timeout(connect=2.0, read=8.0, write=2.0, pool=1.0),  # fail fast on hung connections
+    limits=httpx.Limits(max_keepalive_connections=64, max_connections=128)
+)
+
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    # Close pooled connections on shutdown
+    try:
+        yield
+    finally:
+        await _HTTP.aclose()
+
+# Max summary crews running at once in summarize_prs_batch
+_CREW_CONCURRENCY = int(os.getenv("CREW_CONCURRENCY", "8"))
+
 # Initialize MCP server WITH auth passed to constructor
-mcp = FastMCP("CrewAI GitHub Demo", auth=auth)
+mcp = FastMCP("CrewAI GitHub Demo", auth=auth, lifespan=lifespan)
 
 # ============================================================================
 # UNAUTHENTICATED TOOL (just for testing server is running)
@@ -39,17 +78,32 @@ async def echo_tool(ctx: Context, message: str) -> str:
 @mcp.tool(name="fetch_pr_simple", description="Fetch PR (no auth)")
 async def fetch_pr_simple(ctx: Context, repo: str, pr_number: int) -> dict:
     # Use public GitHub API (no auth required for public repos)
-    url = f"https://api.github.com/repos/{repo}/pulls/{pr_number}"
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            return {
-                "title": data.get("title"),
-                "state": data.get("state"),
-                "user": data.get("user", {}).get("login")
-            }
-        return {"error": f"Status {response.status_code}"}
+    response = await cached_get(_HTTP, f"/repos/{repo}/pulls/{pr_number}")
+    if response.status_code == 200:
+        data = orjson.loads(response.content)
+        return {
+            "title": data.get("title"),
+            "state": data.get("state"),
+            "user": data.get("user", {}).get("login")
+        }
+    return {"error": f"Status {response.status_code}"}
+
+# Token classification (username, is_bot, oauth_scopes) by token hash
+_TOKEN_INFO = TTLCache(maxsize=256, ttl=300)
+
+def _fetch_installation_repos(token: str):
+    # Installation token: use /installation/repositories
+    return cached_get(_HTTP, "/installation/repositories", token)
+
+def _fetch_user_repos(token: str):
+    # User access token: use /user/repos
+    return cached_get(
+        _HTTP, "/user/repos", token,
+        params={
+            "affiliation": "owner,collaborator,organization_member",
+            "per_page": 100
+        }
+    )
 
 @mcp.tool(name="test_github_token", description="Test GitHub token and permissions (works for OAuth and GitHub Apps)")
 @auth_provider.grant("https://api.github.com")
@@ -66,69 +120,78 @@ async def test_github_token(ctx: Context) -> str:
         if not token:
             return "❌ No token received from Keycard"
 
-        async with httpx.AsyncClient() as client:
-            # Test 1: Get authenticated user/app
-            user_response = await client.get(
-                "https://api.github.com/user",
-                headers={
-                    "Authorization": f"Bearer {token}",
-                    "Accept": "application/vnd.github.v3+json"
-                }
-            )
-
-            if user_response.status_code != 200:
-                return f"❌ Token invalid: {user_response.status_code} - {user_response.text}"
-
-            user_data = user_response.json()
-            username = user_data.get("login")
-
-            # Test 2: Check if this is a GitHub App token
-            is_bot = user_data.get("type") == "Bot"
-            oauth_scopes = user_response.headers.get("X-OAuth-Scopes", "")
-
-            # Test 3: Check accessible repositories
-            # Use different endpoint based on token type
-            if not oauth_scopes:
-                # GitHub App token (user access token or installation token)
-                if is_bot:
-                    # Installation token: use /installation/repositories
-                    repos_response = await client.get(
-                        "https://api.github.com/installation/repositories",
-                        headers={
-                            "Authorization": f"Bearer {token}",
-                            "Accept": "application/vnd.github+json"
-                        }
-                    )
-                    token_type = "Installation Access Token"
+        # Token type rarely changes, so repeat diagnostics of GitHub App tokens
+        # skip /user and the speculative probes and go straight to the right
+        # repos endpoint
+        token_key = hashlib.blake2b(token.encode(), digest_size=8).hexdigest()
+        token_info = _TOKEN_INFO.get(token_key)
+
+        if token_info is None:
+            # Fire all probes at once: /user decides which repos endpoint we need,
+            # but the repos calls don't depend on its body, so start them speculatively
+            user_task = asyncio.create_task(cached_get(_HTTP, "/user", token))
+            install_repos_task = asyncio.create_task(_fetch_installation_repos(token))
+            user_repos_task = asyncio.create_task(_fetch_user_repos(token))
+
+            try:
+                # Test 1: Get authenticated user/app
+                user_response = await user_task
+
+                if user_response.status_code != 200:
+                    return f"❌ Token invalid: {user_response.status_code} - {error_snippet(user_response)}"
+
+                user_data = orjson.loads(user_response.content)
+
+                # Test 2: Check if this is a GitHub App token
+                token_info = (
+                    user_data.get("login"),
+                    user_data.get("type") == "Bot",
+                    user_response.headers.get("X-OAuth-Scopes", "")
+                )
+                username, is_bot, oauth_scopes = token_info
+
+                # Only GitHub App tokens are cached: their repos call still hits
+                # GitHub on every run, whereas an OAuth token's only check is
+                # /user, so caching it would hide a revoked token
+                if not oauth_scopes:
+                    _TOKEN_INFO[token_key] = token_info
+
+                # Test 3: Check accessible repositories
+                # Use different endpoint based on token type
+                if not oauth_scopes:
+                    repos_response = await (install_repos_task if is_bot else user_repos_task)
+            finally:
+                # Drop whichever speculative probes we didn't need
+                for task in (install_repos_task, user_repos_task):
+                    task.cancel()
+                await asyncio.gather(install_repos_task, user_repos_task, return_exceptions=True)
+        else:
+            username, is_bot, oauth_scopes = token_info
+            repos_response = await (_fetch_installation_repos(token) if is_bot else _fetch_user_repos(token))
+
+            # /user was skipped, so a revoked token first shows up here
+            if repos_response.status_code == 401:
+                _TOKEN_INFO.pop(token_key, None)
+                return f"❌ Token invalid: {repos_response.status_code} - {error_snippet(repos_response)}"
+
+        # GitHub App token (user access token or installation token)
+        token_type = "Installation Access Token" if is_bot else "User Access Token"
+
+        if not oauth_scopes:
+            if repos_response.status_code == 200:
+                repos_data = orjson.loads(repos_response.content)
+
+                # Handle different response formats
+                if isinstance(repos_data, dict) and "total_count" in repos_data:
+                    # /installation/repositories format
+                    repo_count = repos_data["total_count"]
+                    repo_names = [r["full_name"] for r in repos_data.get("repositories", [])[:5]]
                 else:
-                    # User access token: use /user/repos
-                    repos_response = await client.get(
-                        "https://api.github.com/user/repos",
-                        params={
-                            "affiliation": "owner,collaborator,organization_member",
-                            "per_page": 100
-                        },
-                        headers={
-                            "Authorization": f"Bearer {token}",
-                            "Accept": "application/vnd.github+json"
-                        }
-                    )
-                    token_type = "User Access Token"
-
-                if repos_response.status_code == 200:
-                    repos_data = repos_response.json()
-
-                    # Handle different response formats
-                    if isinstance(repos_data, dict) and "total_count" in repos_data:
-                        # /installation/repositories format
-                        repo_count = repos_data["total_count"]
-                        repo_names = [r["full_name"] for r in repos_data.get("repositories", [])[:5]]
-                    else:
-                        # /user/repos format (array)
-                        repo_count = len(repos_data)
-                        repo_names = [r["full_name"] for r in repos_data[:5]]
-
-                    return f"""✅ GitHub App token works!
+                    # /user/repos format (array)
+                    repo_count = len(repos_data)
+                    repo_names = [r["full_name"] for r in repos_data[:5]]
+
+                return f"""✅ GitHub App token works!
 
 Token Type: GitHub App {token_type}
 Authenticated as: {username}{"  (Bot)" if is_bot else ""}
@@ -143,12 +206,12 @@ Empty X-OAuth-Scopes header is EXPECTED for GitHub Apps.
 
 {"This is a user access token - it acts on your behalf with the intersection of your permissions and the app's permissions." if not is_bot else "This is an installation token - it acts as the app itself."}
 """
-                else:
-                    return f"""⚠️ GitHub App token valid but can't list repositories
+            else:
+                return f"""⚠️ GitHub App token valid but can't list repositories
 
 Authenticated as: {username}
 Token Type: {token_type}
-Error: {repos_response.status_code} - {repos_response.text}
+Error: {repos_response.status_code} - {error_snippet(repos_response)}
 
 This usually means:
 1. GitHub App doesn't have required permissions configured
@@ -161,8 +224,8 @@ Fix:
 - Check installation configuration includes target repositories
 """
 
-            # OAuth App token (has X-OAuth-Scopes)
-            return f"""✅ OAuth App token works!
+        # OAuth App token (has X-OAuth-Scopes)
+        return f"""✅ OAuth App token works!
 
 Token Type: OAuth App Token
 Authenticated as: {username}
@@ -174,7 +237,6 @@ Current scopes: {oauth_scopes}
 """
 
     except Exception as e:
-        import traceback
         return f"❌ Error testing token: {str(e)}\n\n{traceback.format_exc()}"
 
 @mcp.tool(name="analyze_pr", description="Deep PR analysis using 4-agent crew (Overview → Code Review → Community → Summary)")
@@ -191,8 +253,6 @@ async def analyze_pr_tool(ctx: Context, repo: str, pr_number: int) -> str:
 
     Agents 1-3 independently call GitHub API with the same delegated token!
     """
-    from .crews.pr_analyzer import run_pr_analysis_crew
-
     try:
         # Get access context
         access_context = ctx.get_state("keycardai")
@@ -212,23 +272,23 @@ async def analyze_pr_tool(ctx: Context, repo: str, pr_number: int) -> str:
 
         # Log token info
         token_preview = f"{github_token[:4]}...{github_token[-4:]}" if len(github_token) > 8 else "***"
-        print(f"[DEBUG] analyze_pr: Got GitHub token: {token_preview}, length: {len(github_token)}")
-        print(f"[DEBUG] analyze_pr: Running 4-agent crew for {repo}#{pr_number}")
+        log.debug("analyze_pr: Got GitHub token: %s, length: %d", token_preview, len(github_token))
+        log.debug("analyze_pr: Running 4-agent crew for %s#%s", repo, pr_number)
+
+        # Warm the cache with everything the agents will ask for, in parallel
+        await prefetch_pr_bundle(_HTTP, repo, pr_number, github_token)
 
-        # Run multi-agent crew (agents 1-3 will independently call GitHub API!)
-        result = run_pr_analysis_crew(repo, pr_number, github_token)
+        # Run multi-agent crew (agents 1-3 run concurrently and independently call GitHub API!)
+        result = await run_pr_analysis_crew(repo, pr_number, github_token)
         return result
 
     except Exception as e:
-        import traceback
         error_details = traceback.format_exc()
         return f"❌ Error in analyze_pr: {str(e)}\n\nDetails:\n{error_details}"
 
 @mcp.tool(name="summarize_pr", description="Summarize a GitHub PR using AI (single agent, faster)")
 @auth_provider.grant("https://api.github.com")
 async def summarize_pr_tool(ctx: Context, repo: str, pr_number: int) -> str:
-    from .crews.pr_summarizer import run_pr_summary_crew
-
     try:
         # Get access context
         access_context = ctx.get_state("keycardai")
@@ -248,17 +308,70 @@ async def summarize_pr_tool(ctx: Context, repo: str, pr_number: int) -> str:
 
         # Log token info (first/last 4 chars only for security)
         token_preview = f"{github_token[:4]}...{github_token[-4:]}" if len(github_token) > 8 else "***"
-        print(f"[DEBUG] Got GitHub token: {token_preview}, length: {len(github_token)}")
+        log.debug("summarize_pr: Got GitHub token: %s, length: %d", token_preview, len(github_token))
+
+        # Prefetch the PR so the agent doesn't spend an LLM turn calling fetch_pr
+        # (this also warms the cache if it does call it)
+        pr_response = await cached_get(_HTTP, f"/repos/{repo}/pulls/{pr_number}", github_token)
+        pr_details = format_pr_details(orjson.loads(pr_response.content)) if pr_response.status_code == 200 else None
 
         # Call crew
-        result = run_pr_summary_crew(repo, pr_number, github_token=github_token)
+        result = await run_pr_summary_crew(repo, pr_number, github_token=github_token, pr_details=pr_details)
         return result
 
     except Exception as e:
-        import traceback
         error_details = traceback.format_exc()
         return f"❌ Error: {str(e)}\n\nDetails:\n{error_details}"
 
+@mcp.tool(name="summarize_prs_batch", description="Summarize many GitHub PRs concurrently")
+@auth_provider.grant("https://api.github.com")
+async def summarize_prs_batch_tool(ctx: Context, items: list[PRArgSchema]) -> str:
+    """
+    Batched version of summarize_pr.
+
+    Runs one summary crew per PR, at most CREW_CONCURRENCY at a time.
+    A failure on one PR is reported inline and doesn't abort the batch.
+    """
+    try:
+        # Get access context
+        access_context = ctx.get_state("keycardai")
+
+        # CHECK: Did token exchange fail?
+        if access_context.has_errors():
+            errors = access_context.get_errors()
+            return f"❌ Token exchange failed: {errors}"
+
+        # Get GitHub token
+        github_access = access_context.access("https://api.github.com")
+        github_token = github_access.access_token
+
+        # CHECK: Did we actually get a token?
+        if not github_token:
+            return f"❌ No GitHub token received from Keycard. Provider may not be configured."
+
+        log.debug("summarize_prs_batch: Running %d summary crews", len(items))
+
+        # One tool instance for the whole batch
+        tools = [FetchPRTool(github_token=github_token)]
+        semaphore = asyncio.Semaphore(_CREW_CONCURRENCY)
+
+        async def summarize_one(item: PRArgSchema) -> str:
+            async with semaphore:
+                return await run_pr_summary_crew(item.repo, item.pr_number, github_token=github_token, tools=tools)
+
+        results = await asyncio.gather(*(summarize_one(item) for item in items), return_exceptions=True)
+
+        sections = []
+        for item, result in zip(items, results):
+            if isinstance(result, Exception):
+                result = f"❌ Error: {result}"
+            sections.append(f"## {item.repo}#{item.pr_number}\n\n{result}")
+        return "\n\n".join(sections)
+
+    except Exception as e:
+        error_details = traceback.format_exc()
+        return f"❌ Error in summarize_prs_batch: {str(e)}\n\nDetails:\n{error_details}"
+
 # ============================================================================
 # CREATE APP
 # ============================================================================
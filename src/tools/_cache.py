@@ -0,0 +1,129 @@
+"""
+Short-lived in-process cache for GitHub GET responses.
+
+Entries are keyed by URL, query params and a hash of the token (so users never
+see each other's data). Responses younger than FRESH_TTL are served without
+touching the network. Older ones are revalidated with If-None-Match: a 304 from
+GitHub doesn't count against the rate limit and we serve the cached body.
+
+Requests that do go out are capped at GITHUB_CONCURRENCY in flight, so
+parallel agents/tools can't trip GitHub's secondary rate limits.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+import weakref
+
+from cachetools import TTLCache
+
+log = logging.getLogger(__name__)
+
+FRESH_TTL = 60  # seconds
+
+# Keep entries past FRESH_TTL so they can still be revalidated via ETag
+_cache = TTLCache(maxsize=1024, ttl=600)
+_cache_lock = threading.Lock()  # crew tools run in worker threads
+
+# One lock per key so concurrent callers share a single request (single-flight);
+# the sync variant covers crew tools running in parallel worker threads
+_inflight = weakref.WeakValueDictionary()
+_inflight_sync = weakref.WeakValueDictionary()
+
+# Cap on concurrent outbound GitHub requests (async server calls / sync crew tools)
+_GITHUB_CONCURRENCY = int(os.getenv("GITHUB_CONCURRENCY", "8"))
+_async_limit = asyncio.Semaphore(_GITHUB_CONCURRENCY)
+_sync_limit = threading.BoundedSemaphore(_GITHUB_CONCURRENCY)
+
+# Warn when GitHub reports fewer remaining requests than this
+_RATE_LIMIT_WARN = 100
+
+
+def _key(url: str, params: dict | None, token: str | None) -> tuple:
+    token_hash = hashlib.sha256(token.encode()).hexdigest() if token else None
+    return (url, tuple(sorted((params or {}).items())), token_hash)
+
+
+def _lookup(key: tuple):
+    with _cache_lock:
+        return _cache.get(key)
+
+
+def _is_fresh(entry) -> bool:
+    fetched_at, _, _ = entry
+    return time.monotonic() - fetched_at < FRESH_TTL
+
+
+def _request_headers(token: str | None, headers: dict | None, entry) -> dict:
+    request_headers = dict(headers or {})
+    if token:
+        request_headers["Authorization"] = f"Bearer {token}"
+    if entry and entry[1]:
+        request_headers["If-None-Match"] = entry[1]
+    return request_headers
+
+
+def _resolve(key: tuple, entry, response):
+    """Store a fresh 200, or turn a 304 back into the cached response."""
+    remaining = response.headers.get("X-RateLimit-Remaining")
+    if remaining is not None and int(remaining) < _RATE_LIMIT_WARN:
+        log.warning("GitHub rate limit low: %s requests left (resets at %s)",
+                    remaining, response.headers.get("X-RateLimit-Reset"))
+
+    if response.status_code == 304 and entry:
+        _, etag, cached = entry
+        with _cache_lock:
+            _cache[key] = (time.monotonic(), etag, cached)
+        return cached
+
+    if response.status_code == 200:
+        with _cache_lock:
+            _cache[key] = (time.monotonic(), response.headers.get("ETag"), response)
+
+    return response
+
+
+async def cached_get(client, url: str, token: str | None = None, *, headers: dict | None = None, params: dict | None = None):
+    """GET through the cache using an httpx.AsyncClient."""
+    key = _key(url, params, token)
+
+    lock = _inflight.get(key)
+    if lock is None:
+        lock = _inflight[key] = asyncio.Lock()
+
+    async with lock:
+        entry = _lookup(key)
+        if entry and _is_fresh(entry):
+            return entry[2]
+
+        if _async_limit.locked():
+            log.debug("GitHub concurrency limit (%d) reached, waiting: %s", _GITHUB_CONCURRENCY, url)
+        async with _async_limit:
+            response = await client.get(url, headers=_request_headers(token, headers, entry), params=params)
+        return _resolve(key, entry, response)
+
+
+def cached_get_sync(client, url: str, token: str | None = None, *, headers: dict | None = None, params: dict | None = None):
+    """GET through the cache using an httpx.Client (for sync crew tools)."""
+    key = _key(url, params, token)
+
+    with _cache_lock:
+        lock = _inflight_sync.get(key)
+        if lock is None:
+            lock = _inflight_sync[key] = threading.Lock()
+
+    with lock:
+        entry = _lookup(key)
+        if entry and _is_fresh(entry):
+            return entry[2]
+
+        if not _sync_limit.acquire(blocking=False):
+            log.debug("GitHub concurrency limit (%d) reached, waiting: %s", _GITHUB_CONCURRENCY, url)
+            _sync_limit.acquire()
+        try:
+            response = client.get(url, headers=_request_headers(token, headers, entry), params=params)
+        finally:
+            _sync_limit.release()
+        return _resolve(key, entry, response)
@@ -1,207 +1,301 @@
+import asyncio
+import atexit
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 from crewai.tools import BaseTool
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 import httpx
+import orjson
+from ._cache import cached_get, cached_get_sync
+
+# Shared client so all tool calls reuse one connection pool (and go through the cache)
+_CLIENT = httpx.Client(
+    base_url="https://api.github.com",
+    http2=True,
+    headers={
+        "Accept": "application/vnd.github+json",
+        "X-GitHub-Api-Version": "2022-11-28",
+        "Accept-Encoding": "gzip, br, deflate"
+    },
+    timeout=httpx.Timeout(connect=2.0, read=8.0, write=2.0, pool=1.0),  # fail fast on hung connections
+    limits=httpx.Limits(max_keepalive_connections=20, max_connections=100)
+)
+atexit.register(_CLIENT.close)
+
+# Worker threads for tools that fan out several GitHub requests at once
+_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="github-fetch")
+
+# GitHub API paths (relative to the client's base_url); also the cache keys
+_PR_PATH = "/repos/{repo}/pulls/{pr_number}"
+_PR_FILES_PATH = _PR_PATH + "/files"
+_PR_COMMENTS_PATH = _PR_PATH + "/comments"
+_PR_COMMITS_PATH = _PR_PATH + "/commits"
+
+# Page sizes matching what the tools render, so GitHub trims the response for us
+_PR_FILES_PARAMS = {"per_page": 20}
+_PR_COMMENTS_PARAMS = {"per_page": 10}
+
+# Arguments shared by every PR tool
+class PRArgSchema(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    repo: str = Field(description="Repository (owner/name)")
+    pr_number: int = Field(description="PR number")
+
+def error_snippet(response: httpx.Response, limit: int = 500) -> str:
+    """First `limit` bytes of an error body, decoded (avoids decoding huge payloads)."""
+    return response.content[:limit].decode("utf-8", errors="replace")
 
 # ============================================================================
 # TOOL 1: Fetch PR Details
 # ============================================================================
 
-class FetchPRSchema(BaseModel):
-    repo: str = Field(description="Repository (owner/name)")
-    pr_number: int = Field(description="PR number")
+_PR_TEMPLATE = """Pull Request #{number}: {title}
+
+Author: {author}
+State: {state} {draft}
+Created: {created_at}
+Updated: {updated_at}
+
+Description:
+{body}
+
+Changes:
+- Files changed: {changed_files}
+- Additions: +{additions}
+- Deletions: -{deletions}
+- Commits: {commits}
+- Mergeable: {mergeable_state}
+
+URL: {html_url}
+"""
+
+def format_pr_details(data: dict) -> str:
+    """Format a GitHub pull request payload as readable text for the AI agent."""
+    return _PR_TEMPLATE.format_map({
+        "number": data.get("number"),
+        "title": data.get("title", "No title"),
+        "author": (data.get("user") or {}).get("login", "Unknown"),
+        "state": data.get("state", "unknown"),
+        "draft": "(Draft)" if data.get("draft", False) else "",
+        "created_at": data.get("created_at", ""),
+        "updated_at": data.get("updated_at", ""),
+        "body": (data.get("body") or "No description provided")[:1000],
+        "changed_files": data.get("changed_files", 0),
+        "additions": data.get("additions", 0),
+        "deletions": data.get("deletions", 0),
+        "commits": data.get("commits", 0),
+        "mergeable_state": data.get("mergeable_state", "unknown"),
+        "html_url": data.get("html_url", ""),
+    })
+
+def _fetch_pr_details(repo: str, pr_number: int, github_token: str | None) -> str:
+    url = _PR_PATH.format(repo=repo, pr_number=pr_number)
+    response = cached_get_sync(_CLIENT, url, github_token)
+
+    if response.status_code != 200:
+        return f"Error: {response.status_code} - {error_snippet(response)}"
+
+    return format_pr_details(orjson.loads(response.content))
 
 class FetchPRTool(BaseTool):
     name: str = "fetch_pr"
     description: str = "Fetch PR details from GitHub"
-    args_schema: type[BaseModel] = FetchPRSchema
+    args_schema: type[BaseModel] = PRArgSchema
     github_token: str | None = None
 
     def _run(self, repo: str, pr_number: int) -> str:
-        url = f"https://api.github.com/repos/{repo}/pulls/{pr_number}"
-        headers = {
-            "Accept": "application/vnd.github.v3+json"
-        }
-        if self.github_token:
-            headers["Authorization"] = f"Bearer {self.github_token}"
+        return _fetch_pr_details(repo, pr_number, self.github_token)
 
-        response = httpx.get(url, headers=headers, timeout=10)
+# ============================================================================
+# TOOL 1b: Fetch Several PRs
+# ============================================================================
 
-        if response.status_code != 200:
-            return f"Error: {response.status_code} - {response.text}"
-
-        data = response.json()
-
-        # Extract comprehensive PR information
-        pr_info = {
-            "title": data.get("title", "No title"),
-            "number": data.get("number"),
-            "author": data.get("user", {}).get("login", "Unknown"),
-            "state": data.get("state", "unknown"),
-            "created_at": data.get("created_at", ""),
-            "updated_at": data.get("updated_at", ""),
-            "body": data.get("body", "No description provided"),
-            "html_url": data.get("html_url", ""),
-            "additions": data.get("additions", 0),
-            "deletions": data.get("deletions", 0),
-            "changed_files": data.get("changed_files", 0),
-            "commits": data.get("commits", 0),
-            "mergeable_state": data.get("mergeable_state", "unknown"),
-            "draft": data.get("draft", False),
-        }
-
-        # Format as readable text for the AI agent
-        return f"""Pull Request #{pr_info['number']}: {pr_info['title']}
-
-Author: {pr_info['author']}
-State: {pr_info['state']} {'(Draft)' if pr_info['draft'] else ''}
-Created: {pr_info['created_at']}
-Updated: {pr_info['updated_at']}
+class FetchPRsSchema(BaseModel):
+    model_config = ConfigDict(frozen=True)
 
-Description:
-{pr_info['body'][:1000] if pr_info['body'] else 'No description provided'}
+    repo: str = Field(description="Repository (owner/name)")
+    pr_numbers: list[int] = Field(description="PR numbers")
 
-Changes:
-- Files changed: {pr_info['changed_files']}
-- Additions: +{pr_info['additions']}
-- Deletions: -{pr_info['deletions']}
-- Commits: {pr_info['commits']}
-- Mergeable: {pr_info['mergeable_state']}
+class FetchPRsTool(BaseTool):
+    name: str = "fetch_prs"
+    description: str = "Fetch details for several PRs in one repository at once"
+    args_schema: type[BaseModel] = FetchPRsSchema
+    github_token: str | None = None
 
-URL: {pr_info['html_url']}
-"""
+    def _fetch_one(self, repo: str, pr_number: int) -> str:
+        # A network failure on one PR shouldn't lose the others
+        try:
+            result = _fetch_pr_details(repo, pr_number, self.github_token)
+        except httpx.HTTPError as e:
+            return f"Error: PR #{pr_number} - {type(e).__name__}: {e}"
+        # Name the PR in HTTP status errors too, so failures are identifiable in the batch
+        if result.startswith("Error: "):
+            return f"Error: PR #{pr_number} - {result[len('Error: '):]}"
+        return result
+
+    def _run(self, repo: str, pr_numbers: list[int]) -> str:
+        # Fetch concurrently; results come back in the order requested
+        results = _EXECUTOR.map(lambda n: self._fetch_one(repo, n), pr_numbers)
+        return "\n---\n\n".join(results)
 
 # ============================================================================
 # TOOL 2: Fetch PR Files
 # ============================================================================
 
-class FetchPRFilesSchema(BaseModel):
-    repo: str = Field(description="Repository (owner/name)")
-    pr_number: int = Field(description="PR number")
-
 class FetchPRFilesTool(BaseTool):
     name: str = "fetch_pr_files"
     description: str = "Fetch list of files changed in a PR with diffs"
-    args_schema: type[BaseModel] = FetchPRFilesSchema
+    args_schema: type[BaseModel] = PRArgSchema
     github_token: str | None = None
 
     def _run(self, repo: str, pr_number: int) -> str:
-        url = f"https://api.github.com/repos/{repo}/pulls/{pr_number}/files"
-        headers = {"Accept": "application/vnd.github.v3+json"}
-        if self.github_token:
-            headers["Authorization"] = f"Bearer {self.github_token}"
-
-        response = httpx.get(url, headers=headers, timeout=10)
+        url = _PR_FILES_PATH.format(repo=repo, pr_number=pr_number)
+        response = cached_get_sync(_CLIENT, url, self.github_token, params=_PR_FILES_PARAMS)
 
         if response.status_code != 200:
-            return f"Error: {response.status_code} - {response.text}"
-
-        files = response.json()
-
-        output = f"Files changed in PR: {len(files)}\n\n"
-        for file in files[:20]:  # Limit to first 20 files
-            output += f"""File: {file['filename']}
+            return f"Error: {response.status_code} - {error_snippet(response)}"
+
+        files = orjson.loads(response.content)
+
+        # Only one page is requested, so a full page means the PR may have more files
+        if len(files) == _PR_FILES_PARAMS["per_page"]:
+            parts = [f"Files changed in PR: showing first {len(files)} (more may exist)\n\n"]
+        else:
+            parts = [f"Files changed in PR: {len(files)}\n\n"]
+        for file in files:
+            patch = file.get('patch', 'No patch available')[:500]
+            parts.append(f"""File: {file['filename']}
 Status: {file['status']}
 Changes: +{file['additions']} -{file['deletions']}
 Patch preview:
-{file.get('patch', 'No patch available')[:500]}
+{patch}
 
 ---
-"""
-        return output
+""")
+        return "".join(parts)
 
 # ============================================================================
 # TOOL 3: Fetch PR Comments
 # ============================================================================
 
-class FetchPRCommentsSchema(BaseModel):
-    repo: str = Field(description="Repository (owner/name)")
-    pr_number: int = Field(description="PR number")
-
 class FetchPRCommentsTool(BaseTool):
     name: str = "fetch_pr_comments"
     description: str = "Fetch review comments and discussions on a PR"
-    args_schema: type[BaseModel] = FetchPRCommentsSchema
+    args_schema: type[BaseModel] = PRArgSchema
     github_token: str | None = None
 
     def _run(self, repo: str, pr_number: int) -> str:
-        url = f"https://api.github.com/repos/{repo}/pulls/{pr_number}/comments"
-        headers = {"Accept": "application/vnd.github.v3+json"}
-        if self.github_token:
-            headers["Authorization"] = f"Bearer {self.github_token}"
-
-        response = httpx.get(url, headers=headers, timeout=10)
+        url = _PR_COMMENTS_PATH.format(repo=repo, pr_number=pr_number)
+        response = cached_get_sync(_CLIENT, url, self.github_token, params=_PR_COMMENTS_PARAMS)
 
         if response.status_code != 200:
-            return f"Error: {response.status_code} - {response.text}"
+            return f"Error: {response.status_code} - {error_snippet(response)}"
 
-        comments = response.json()
+        comments = orjson.loads(response.content)
 
         if not comments:
             return "No review comments on this PR."
 
-        output = f"Review Comments ({len(comments)} total):\n\n"
-        for comment in comments[:10]:  # Limit to first 10
-            output += f"""Comment by {comment['user']['login']}:
+        # Only one page is requested, so a full page means there may be more comments
+        if len(comments) == _PR_COMMENTS_PARAMS["per_page"]:
+            parts = [f"Review Comments (showing first {len(comments)}, more may exist):\n\n"]
+        else:
+            parts = [f"Review Comments ({len(comments)} total):\n\n"]
+        for comment in comments:
+            parts.append(f"""Comment by {comment['user']['login']}:
 File: {comment.get('path', 'General')}
 Line: {comment.get('line', 'N/A')}
 Comment: {comment['body']}
 
 ---
-"""
-        return output
+""")
+        return "".join(parts)
 
 # ============================================================================
 # TOOL 4: Fetch PR Commits
 # ============================================================================
 
-class FetchPRCommitsSchema(BaseModel):
-    repo: str = Field(description="Repository (owner/name)")
-    pr_number: int = Field(description="PR number")
-
 class FetchPRCommitsTool(BaseTool):
     name: str = "fetch_pr_commits"
     description: str = "Fetch list of commits in a PR"
-    args_schema: type[BaseModel] = FetchPRCommitsSchema
+    args_schema: type[BaseModel] = PRArgSchema
     github_token: str | None = None
 
     def _run(self, repo: str, pr_number: int) -> str:
-        url = f"https://api.github.com/repos/{repo}/pulls/{pr_number}/commits"
-        headers = {"Accept": "application/vnd.github.v3+json"}
-        if self.github_token:
-            headers["Authorization"] = f"Bearer {self.github_token}"
-
-        response = httpx.get(url, headers=headers, timeout=10)
+        url = _PR_COMMITS_PATH.format(repo=repo, pr_number=pr_number)
+        response = cached_get_sync(_CLIENT, url, self.github_token)
 
         if response.status_code != 200:
-            return f"Error: {response.status_code} - {response.text}"
+            return f"Error: {response.status_code} - {error_snippet(response)}"
 
-        commits = response.json()
+        commits = orjson.loads(response.content)
 
-        output = f"Commits in PR: {len(commits)}\n\n"
+        parts = [f"Commits in PR: {len(commits)}\n\n"]
         for commit in commits:
-            output += f"""Commit: {commit['sha'][:7]}
+            parts.append(f"""Commit: {commit['sha'][:7]}
 Author: {commit['commit']['author']['name']}
 Date: {commit['commit']['author']['date']}
 Message: {commit['commit']['message']}
 
 ---
-"""
-        return output
+""")
+        return "".join(parts)
 
 # ============================================================================
 # TOOL FACTORY: Create all tools with shared token
 # ============================================================================
 
+# Recently used tool sets, keyed by token hash (bounded so old tokens get dropped)
+_TOOLS_CACHE: OrderedDict[str, list[BaseTool]] = OrderedDict()
+_TOOLS_CACHE_SIZE = 32
+
 def create_github_tools(github_token: str):
     """
     Create all GitHub tools with the delegated token.
 
     Returns a list of tools that can be shared across multiple agents.
     All tools use the same token, so all API calls are attributed to the user.
+    Tool sets are memoized per token, so repeat runs for the same user reuse them.
     """
-    return [
+    key = hashlib.sha256(github_token.encode()).hexdigest()
+
+    tools = _TOOLS_CACHE.get(key)
+    if tools is not None:
+        _TOOLS_CACHE.move_to_end(key)
+        return tools
+
+    tools = [
         FetchPRTool(github_token=github_token),
+        FetchPRsTool(github_token=github_token),
         FetchPRFilesTool(github_token=github_token),
         FetchPRCommentsTool(github_token=github_token),
         FetchPRCommitsTool(github_token=github_token),
-    ]
\ No newline at end of file
+    ]
+    _TOOLS_CACHE[key] = tools
+    if len(_TOOLS_CACHE) > _TOOLS_CACHE_SIZE:
+        _TOOLS_CACHE.popitem(last=False)
+    return tools
+
+async def prefetch_pr_bundle(client: httpx.AsyncClient, repo: str, pr_number: int, github_token: str):
+    """
+    Fetch a PR plus its files, comments and commits concurrently.
+
+    Responses land in the shared cache under the same keys the tools use,
+    so the agents' later tool calls are cache hits. Failures are returned
+    (not raised) so one bad endpoint doesn't sink the rest.
+    """
+    requests = [
+        (_PR_PATH, None),
+        (_PR_FILES_PATH, _PR_FILES_PARAMS),
+        (_PR_COMMENTS_PATH, _PR_COMMENTS_PARAMS),
+        (_PR_COMMITS_PATH, None),
+    ]
+    return await asyncio.gather(
+        *(
+            cached_get(client, path.format(repo=repo, pr_number=pr_number), github_token, params=params)
+            for path, params in requests
+        ),
+        return_exceptions=True
+    )
@@ -10,29 +10,31 @@ Uses the keycardai-mcp-fastmcp package for FastMCP integration.
 """
 
 import os
+import sys
 from dotenv import load_dotenv
 
 # Load environment variables from src/.env
 load_dotenv("src/.env")
 
+BAR60 = "=" * 60
+
+# Read the Keycard settings once at import
+_ENV = {k: os.environ.get(k) for k in ("KEYCARD_ZONE_ID", "KEYCARD_CLIENT_ID", "KEYCARD_CLIENT_SECRET")}
+
 def test_keycard():
     """Test Keycard configuration using AuthProvider."""
 
     # Get credentials from environment
-    zone_id = os.getenv("KEYCARD_ZONE_ID")
-    client_id = os.getenv("KEYCARD_CLIENT_ID")
-    client_secret = os.getenv("KEYCARD_CLIENT_SECRET")
+    zone_id = _ENV["KEYCARD_ZONE_ID"]
+    client_id = _ENV["KEYCARD_CLIENT_ID"]
+    client_secret = _ENV["KEYCARD_CLIENT_SECRET"]
 
     # Verify env vars are loaded
-    print("=" * 60)
-    print("🔍 Checking Environment Variables")
-    print("=" * 60)
-
-    if not zone_id or not client_id or not client_secret:
-        print("❌ Missing required environment variables!")
-        print(f"   KEYCARD_ZONE_ID: {'✓' if zone_id else '✗ MISSING'}")
-        print(f"   KEYCARD_CLIENT_ID: {'✓' if client_id else '✗ MISSING'}")
-        print(f"   KEYCARD_CLIENT_SECRET: {'✓' if client_secret else '✗ MISSING'}")
+    print(f"{BAR60}\n🔍 Checking Environment Variables\n{BAR60}")
+
+    missing = [name for name, value in _ENV.items() if not value]
+    if missing:
+        print(f"❌ Missing required environment variables: {', '.join(missing)}")
         print("\n💡 Add these to src/.env file:")
         print("   KEYCARD_ZONE_ID=your_zone_id")
         print("   KEYCARD_CLIENT_ID=your_client_id")
@@ -45,9 +47,7 @@ def test_keycard():
     print()
 
     # Try to create AuthProvider
-    print("=" * 60)
-    print("🔗 Testing Keycard Configuration")
-    print("=" * 60)
+    print(f"{BAR60}\n🔗 Testing Keycard Configuration\n{BAR60}")
 
     try:
         # Import here so we can give a better error message if not installed
@@ -67,21 +67,22 @@ def test_keycard():
             application_credential=ClientSecret((client_id, client_secret))
         )
 
-        print("✅ AuthProvider created successfully!")
-        print(f"   Zone ID: {zone_id}")
-        print(f"   MCP Server: CrewAI GitHub MCP Server")
-        print(f"   Base URL: http://localhost:8000/")
-        print()
-
-        print("=" * 60)
-        print("🎉 SUCCESS! Keycard is configured correctly")
-        print("=" * 60)
-        print("✓ Application credentials are valid")
-        print("✓ AuthProvider initialized")
-        print("✓ Ready to add authentication to MCP server!")
-        print()
-        print("Next step: Phase 4 - Add Keycard auth to your MCP server")
-        print()
+        sys.stdout.write("\n".join([
+            "✅ AuthProvider created successfully!",
+            f"   Zone ID: {zone_id}",
+            "   MCP Server: CrewAI GitHub MCP Server",
+            "   Base URL: http://localhost:8000/",
+            "",
+            BAR60,
+            "🎉 SUCCESS! Keycard is configured correctly",
+            BAR60,
+            "✓ Application credentials are valid",
+            "✓ AuthProvider initialized",
+            "✓ Ready to add authentication to MCP server!",
+            "",
+            "Next step: Phase 4 - Add Keycard auth to your MCP server",
+            "",
+        ]) + "\n")
 
         return True
 
@@ -102,11 +103,13 @@ def test_keycard():
         return False
 
 if __name__ == "__main__":
-    print()
-    print("╔" + "═" * 58 + "╗")
-    print("║" + " " * 15 + "Keycard Configuration Test" + " " * 17 + "║")
-    print("╚" + "═" * 58 + "╝")
-    print()
+    sys.stdout.write("\n".join([
+        "",
+        "╔" + "═" * 58 + "╗",
+        "║" + " " * 15 + "Keycard Configuration Test" + " " * 17 + "║",
+        "╚" + "═" * 58 + "╝",
+        "",
+    ]) + "\n")
 
     success = test_keycard()
 